@@ -11,28 +11,46 @@ File utama: bot.py
 import os
 import sys
 import atexit
+import fcntl
 
 DATA_DIR = os.getenv("DATA_DIR", "/app/data")
 os.makedirs(DATA_DIR, exist_ok=True)
 
 LOCK_FILE = os.path.join(DATA_DIR, "bot.lock")
+_lock_fd = None  # kept open for the whole process; closing it (or dying) releases the lock
 
-if os.path.exists(LOCK_FILE):
-    print("❌ Bot already running (lock file detected). Exiting.")
-    sys.exit(0)
 
-with open(LOCK_FILE, "w") as f:
-    f.write(str(os.getpid()))
+def acquire_lock():
+    # flock is atomic and the kernel drops it when the holder exits, so there is no
+    # stale-lock guessing: the file's content (PID) is informational only
+    global _lock_fd
+    fd = os.open(LOCK_FILE, os.O_CREAT | os.O_RDWR, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        print("❌ Bot already running (lock file detected). Exiting.")
+        sys.exit(0)
+    os.ftruncate(fd, 0)
+    os.write(fd, str(os.getpid()).encode())
+    _lock_fd = fd
+
 
+acquire_lock()
 print("✅ Lock acquired, bot starting...")
 
 def cleanup_lock():
+    # release only: after an unlink, two instances could each lock a different file
+    # (one the old, unlinked inode, one a freshly created lock file)
+    global _lock_fd
+    if _lock_fd is None:
+        return
     try:
-        if os.path.exists(LOCK_FILE):
-            os.remove(LOCK_FILE)
-            print("🧹 Lock file removed, bot stopped cleanly.")
-    except Exception:
+        os.close(_lock_fd)
+        print("🧹 Lock released, bot stopped cleanly.")
+    except OSError:
         pass
+    _lock_fd = None
 
 atexit.register(cleanup_lock)
 
@@ -42,43 +60,42 @@ atexit.register(cleanup_lock)
 import asyncio
 import logging
 import re
-import requests
 import shutil
 import sqlite3
 import tempfile
 import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
 
 from telegram import (
     InlineKeyboardButton,
     InlineKeyboardMarkup,
+    InputFile,
     Message,
     Update,
 )
 from telegram.constants import ParseMode
-from telegram.error import BadRequest
+from telegram.error import BadRequest, NetworkError, RetryAfter, TimedOut
 from telegram.ext import (
     Application,
     CallbackQueryHandler,
+    ChatMemberHandler,
     CommandHandler,
     ContextTypes,
     MessageHandler,
     filters,
 )
-from telegram.helpers import escape_markdown
+from telegram.helpers import escape_markdown, mention_html
+from telegram.request import HTTPXRequest
 from html import escape as escape_html
 
 
+import aiohttp
 from yt_dlp import YoutubeDL
 
-def download_video(url):
-    ydl_opts = {
-        "outtmpl": "downloads/%(title)s.%(ext)s"
-    }
-    with YoutubeDL(ydl_opts) as ydl:
-        ydl.download([url])
-
 
 # ======================
 # CONFIG
@@ -89,6 +106,8 @@ logger = logging.getLogger(__name__)
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 OWNER_ID = int(os.getenv("OWNER_ID", "7186582328"))
 TAGS = ["#pria", "#wanita"]
+# one case-insensitive pass over the raw text, no lowered copy
+TAG_RE = re.compile(r"#(" + "|".join(t.lstrip("#") for t in TAGS) + r")\b", re.IGNORECASE)
 CHANNEL_ID = int(os.getenv("CHANNEL_ID", "-1003595038397"))
 LOG_CHANNEL_ID = int(os.getenv("LOG_CHANNEL_ID", "-1003439614621"))
 
@@ -102,12 +121,24 @@ MAX_PHOTO_VIDEO_PER_DAY = 10
 MAX_TEXT_PER_DAY = 5
 DAILY_SECONDS = 24 * 60 * 60
 
+TELEGRAM_MAX_BYTES = 50 * 1024 * 1024  # max file size the bot can send
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+FFMPEG_AVAILABLE = shutil.which("ffmpeg") is not None  # resolved once, PATH doesn't change at runtime
+
 USER_DAILY_STATS: dict[int, dict] = {}  # user_id -> {"count": int, "first_ts": float} (for downloads)
 USER_ACTIVE_DOWNLOAD: set[int] = set()
-download_lock = asyncio.Semaphore(1)
-
-# New: per-user post stats (photo/video and text) stored in-memory
-USER_POST_STATS: Dict[int, Dict[str, int or float]] = {}  # user_id -> {"first_ts": float, "photos_vids": int, "texts": int}
+DL_CONCURRENCY = int(os.getenv("DL_CONCURRENCY", "4"))  # parallel yt-dlp jobs (bounds RAM / ffmpeg forks)
+download_lock = asyncio.Semaphore(DL_CONCURRENCY)
+
+# New: per-user post stats (photo/video and text) stored in-memory.
+# Struct-of-arrays: USER_POST_IDX maps user_id -> slot, the slot indexes the three parallel arrays.
+USER_POST_IDX: Dict[int, int] = {}
+POST_FIRST_TS = array("d")  # window start per slot
+POST_MEDIA = array("i")  # photos/videos posted in window
+POST_TEXT = array("i")  # texts posted in window
+POST_STATS_DIRTY: set[int] = set()  # user_ids changed since the last flush to SQLite
+POST_STATS_FLUSH_SECONDS = 5
+STATS_SWEEP_SECONDS = 600  # evict expired quota entries every 10 minutes
 
 # ======================
 # DATABASE (safe path + fallback)
@@ -122,13 +153,49 @@ except Exception as e:
     DB_PATH = ":memory:"
     logger.warning("Menggunakan SQLite in-memory fallback (tidak persistent).")
 
+# WAL + NORMAL sync: one fsync per checkpoint instead of per commit.
+# busy_timeout lets concurrent handlers wait for the lock instead of failing.
+# mmap_size lets SELECTs read pages straight from the mapping instead of copying via the pager.
+DB_PRAGMAS = (
+    "synchronous=NORMAL",
+    "busy_timeout=30000",
+    "temp_store=MEMORY",
+    "cache_size=-20000",
+    "mmap_size=134217728",
+    "wal_autocheckpoint=1000",
+    "foreign_keys=ON",
+)
+# per-connection settings for the read-only pool (journal/sync settings belong to the writer)
+DB_READER_PRAGMAS = (
+    "busy_timeout=30000",
+    "temp_store=MEMORY",
+    "cache_size=-20000",
+    "mmap_size=134217728",
+)
+
+
+# statements are re-parsed only on a cache miss; the bot issues a few dozen distinct ones
+DB_STMT_CACHE = 256
+
+
+def apply_db_pragmas(conn: sqlite3.Connection, pragmas: Tuple[str, ...] = DB_PRAGMAS, wal: bool = True):
+    if wal:
+        conn.execute("PRAGMA journal_mode=WAL;")
+    for pragma in pragmas:
+        try:
+            conn.execute(f"PRAGMA {pragma};")
+        except sqlite3.DatabaseError:
+            logger.warning("Gagal set PRAGMA %s", pragma)
+
+
 try:
-    db = sqlite3.connect(DB_PATH, check_same_thread=False)
-    db.execute("PRAGMA journal_mode=WAL;")
+    db = sqlite3.connect(DB_PATH, check_same_thread=False, cached_statements=DB_STMT_CACHE)
+    apply_db_pragmas(db)
 except sqlite3.OperationalError as e:
     logger.exception("Gagal membuka database %s: %s", DB_PATH, e)
-    db = sqlite3.connect(":memory:", check_same_thread=False)
-    db.execute("PRAGMA journal_mode=WAL;")
+    DB_PATH = ":memory:"
+    db = sqlite3.connect(":memory:", check_same_thread=False, cached_statements=DB_STMT_CACHE)
+    apply_db_pragmas(db)
     logger.warning("Fallback ke in-memory SQLite database (data tidak disimpan).")
 
 # tables
@@ -147,15 +214,175 @@ CREATE TABLE IF NOT EXISTS welcomed_users (
     user_id INTEGER,
     chat_id INTEGER,
     PRIMARY KEY (user_id, chat_id)
+) WITHOUT ROWID
+"""
+)
+db.execute(
+    """
+CREATE TABLE IF NOT EXISTS post_stats (
+    user_id INTEGER PRIMARY KEY,
+    first_ts REAL,
+    photos_vids INTEGER,
+    texts INTEGER
 )
 """
 )
 db.commit()
 
+# one-time migration: welcomed_users used to be a rowid table plus a separate PK index
+_row = db.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='welcomed_users'").fetchone()
+if _row and "WITHOUT ROWID" not in _row[0].upper():
+    logger.info("Migrasi tabel welcomed_users ke WITHOUT ROWID...")
+    with db:
+        db.execute("BEGIN")  # DDL included, so a crash mid-migration rolls back cleanly
+        db.execute(
+            "CREATE TABLE welcomed_users_new (user_id INTEGER, chat_id INTEGER, PRIMARY KEY (user_id, chat_id)) WITHOUT ROWID"
+        )
+        db.execute("INSERT OR IGNORE INTO welcomed_users_new (user_id, chat_id) SELECT user_id, chat_id FROM welcomed_users")
+        db.execute("DROP TABLE welcomed_users")
+        db.execute("ALTER TABLE welcomed_users_new RENAME TO welcomed_users")
+
+# the PK leads with user_id; /tagall looks up by chat_id
+db.execute("CREATE INDEX IF NOT EXISTS idx_welcomed_chat ON welcomed_users(chat_id)")
+db.commit()
+
+# user_id -> gender for every registered user (write-once, so never invalidated)
+USER_GENDER: Dict[int, str] = dict(db.execute("SELECT user_id, gender FROM users"))
+# (user_id, chat_id) pairs already welcomed, mirrors welcomed_users
+WELCOMED_USERS: set[tuple[int, int]] = set(db.execute("SELECT user_id, chat_id FROM welcomed_users"))
+
+# warm the in-memory post quota cache so limits survive restarts
+for _uid, _first_ts, _media, _texts in db.execute(
+    "SELECT user_id, first_ts, photos_vids, texts FROM post_stats WHERE first_ts > ?", (time.time() - DAILY_SECONDS,)
+):
+    USER_POST_IDX[_uid] = len(POST_FIRST_TS)
+    POST_FIRST_TS.append(_first_ts)
+    POST_MEDIA.append(_media)
+    POST_TEXT.append(_texts)
+
+# ======================
+# DB ACCESS (1 writer + read-only pool)
+# ======================
+# `db` is the single writer; every INSERT/UPDATE/commit goes through _db_lock.
+# Under WAL, readers on separate read-only connections never block on the writer.
+READ_POOL_SIZE = 4
+_db_lock = asyncio.Lock()
+_read_pool: asyncio.Queue = asyncio.Queue()
+
+if DB_PATH == ":memory:":
+    # in-memory DB is private to its connection, readers must share the writer
+    _read_pool.put_nowait(db)
+else:
+    for _ in range(READ_POOL_SIZE):
+        _conn = sqlite3.connect(
+            f"file:{DB_PATH}?mode=ro", uri=True, check_same_thread=False, timeout=30, cached_statements=DB_STMT_CACHE
+        )
+        apply_db_pragmas(_conn, DB_READER_PRAGMAS, wal=False)
+        _read_pool.put_nowait(_conn)
+
+
+DB_FETCH_ARRAYSIZE = 256
+
+
+def _fetchall(conn: sqlite3.Connection, sql: str, params: tuple, max_rows: Optional[int] = None) -> list:
+    cur = conn.execute(sql, params)
+    if max_rows is None:
+        return cur.fetchall()
+    # stop stepping the statement once max_rows are in hand
+    cur.arraysize = DB_FETCH_ARRAYSIZE
+    out = []
+    try:
+        while len(out) < max_rows:
+            chunk = cur.fetchmany()
+            if not chunk:
+                break
+            out.extend(chunk)
+    finally:
+        cur.close()
+    return out[:max_rows]
+
+
+async def db_read(sql: str, params: tuple = (), max_rows: Optional[int] = None) -> list:
+    conn = await _read_pool.get()
+    try:
+        if conn is db:
+            async with _db_lock:
+                return await asyncio.to_thread(_fetchall, conn, sql, params, max_rows)
+        return await asyncio.to_thread(_fetchall, conn, sql, params, max_rows)
+    finally:
+        _read_pool.put_nowait(conn)
+
+
+def _execute_commit(sql: str, params: tuple) -> int:
+    with db:
+        return db.execute(sql, params).rowcount
+
+
+async def db_exec(sql: str, params: tuple = ()) -> int:
+    """Run one write statement + commit in a single worker-thread hop. Returns rowcount."""
+    async with _db_lock:
+        return await asyncio.to_thread(_execute_commit, sql, params)
+
+
+def _executemany_commit(sql: str, rows: list) -> int:
+    with db:
+        return db.executemany(sql, rows).rowcount
+
+
+async def db_exec_many(sql: str, rows: list) -> int:
+    """executemany + one commit, in a single worker-thread hop."""
+    async with _db_lock:
+        return await asyncio.to_thread(_executemany_commit, sql, rows)
+
+
 # ======================
 # HELPERS
 # ======================
 
+# strong refs to fire-and-forget tasks; the event loop only keeps weak ones
+_background_tasks: set[asyncio.Task] = set()
+
+
+def spawn(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+def stream_file(fh, filename: Optional[str] = None) -> InputFile:
+    """Wrap an open file so PTB hands the handle to the HTTP client instead of reading it all into RAM."""
+    return InputFile(fh, filename=filename or os.path.basename(fh.name), read_file_handle=False)
+
+
+MEMBER_STATUS_TTL = 60  # seconds a cached get_chat_member status stays valid
+MEMBER_STATUS_CACHE: Dict[Tuple[int, int], Tuple[str, float]] = {}  # (chat_id, user_id) -> (status, fetched_at)
+
+
+async def get_member_status(bot, chat_id: int, user_id: int) -> Optional[str]:
+    """Chat member status via a short-TTL cache; None if the lookup fails."""
+    now = time.time()
+    cached = MEMBER_STATUS_CACHE.get((chat_id, user_id))
+    if cached and now - cached[1] < MEMBER_STATUS_TTL:
+        return cached[0]
+    try:
+        member = await bot.get_chat_member(chat_id, user_id)
+    except Exception:
+        return None
+    MEMBER_STATUS_CACHE[(chat_id, user_id)] = (member.status, now)
+    return member.status
+
+
+def forget_member_status(chat_id: int, user_id: int) -> None:
+    MEMBER_STATUS_CACHE.pop((chat_id, user_id), None)
+
+
+PRIVILEGED_STATUSES = frozenset(("administrator", "creator"))
+
+
+def is_privileged(user_id: int, status: Optional[str]) -> bool:
+    return user_id == OWNER_ID or status in PRIVILEGED_STATUSES
+
 
 def is_user_allowed(user_id: int, max_daily: int = MAX_DAILY) -> Tuple[bool, int]:
     now = time.time()
@@ -206,34 +433,88 @@ def human_time(seconds: int) -> str:
     return "beberapa detik"
 
 
-URL_RE = re.compile(
-    r"https?://[^\s]+|www\.[^\s]+|t\.me/[^\s]+|telegram\.me/[^\s]+", flags=re.IGNORECASE
+# Prefer google-re2 (linear-time DFA, no backtracking) when installed; stdlib re otherwise.
+# Case-insensitivity is inline so the same pattern compiles on both engines.
+try:
+    import re2 as _url_re_engine
+except ImportError:
+    _url_re_engine = re
+
+URL_RE = _url_re_engine.compile(
+    r"(?i)https?://\S+|www\.\S+|t\.me/\S+|telegram\.me/\S+"
 )
 
+# Optional hyperscan fast path: scans all URL prefixes in one vectorized pass, then
+# the token is cut at the next whitespace. Falls back to URL_RE when not installed.
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+_URL_HS_DB = None
+if hyperscan is not None:
+    try:
+        _URL_HS_DB = hyperscan.Database()
+        _URL_HS_DB.compile(
+            expressions=[rb"https?://", rb"www\.", rb"t\.me/", rb"telegram\.me/"],
+            ids=[0, 1, 2, 3],
+            elements=4,
+            flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SOM_LEFTMOST] * 4,
+        )
+    except Exception:
+        logger.exception("Gagal compile hyperscan database, pakai regex")
+        _URL_HS_DB = None
+
+# same engine as URL_RE, so the token ends where URL_RE's \S+ would end it
+_NON_SPACE_RE = _url_re_engine.compile(r"\S+")
+
+
+def find_url(text: str) -> Optional[str]:
+    """First URL-looking token in text (same semantics as URL_RE)."""
+    if not text:
+        return None
+    if _URL_HS_DB is None:
+        m = URL_RE.search(text)
+        return m.group(0) if m else None
+    hay = text.encode()
+    starts = []
+
+    def on_match(_id, start, _end, _flags, _ctx):
+        starts.append(start)
+
+    _URL_HS_DB.scan(hay, match_event_handler=on_match)
+    if not starts:
+        return None
+    # every prefix starts with an ASCII byte, so the byte offset sits on a char boundary;
+    # map it back to a str index and cut there (a bytes \S+ would ignore Unicode whitespace)
+    start = len(hay[: min(starts)].decode())
+    return _NON_SPACE_RE.match(text, start).group(0)
+
+
+def has_url(msg: Message) -> bool:
+    """True if the message text carries a url/text_link entity (what filters.Entity matched)."""
+    return any(ent.type in ("url", "text_link") for ent in msg.entities or ())
+
 
 def extract_first_url(msg: Message) -> Optional[str]:
     if not msg:
         return None
-    entities = msg.entities or []
-    for ent in entities:
-        if ent.type == "text_link" and ent.url:
-            return ent.url
-        if ent.type == "url" and msg.text:
-            return msg.text[ent.offset : ent.offset + ent.length]
-    entities = msg.caption_entities or []
-    for ent in entities:
-        if ent.type == "text_link" and ent.url:
-            return ent.url
-        if ent.type == "url" and msg.caption:
-            return msg.caption[ent.offset : ent.offset + ent.length]
-    hay = (msg.text or "") + " " + (msg.caption or "")
-    m = URL_RE.search(hay)
-    return m.group(0) if m else None
+    # a message carries either text or a caption, never both
+    for source, entities in ((msg.text, msg.entities), (msg.caption, msg.caption_entities)):
+        for ent in entities or ():
+            if ent.type == "text_link" and ent.url:
+                return ent.url
+            if ent.type == "url" and source:
+                return source[ent.offset : ent.offset + ent.length]
+    return find_url(msg.text or msg.caption or "")
+
+
+# image extension at the end of the path, i.e. right before the first "?" or end of string
+IMG_EXT_RE = re.compile(r"[^?]*\.(?:jpe?g|png|gif|webp|bmp)(?:\?|$)", re.IGNORECASE)
 
 
 def is_image_url(url: str) -> bool:
-    url = url.lower().split("?")[0]
-    return any(url.endswith(ext) for ext in (".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp"))
+    return bool(url) and IMG_EXT_RE.match(url) is not None
 
 
 # ======================
@@ -241,12 +522,20 @@ def is_image_url(url: str) -> bool:
 # ======================
 
 
-def _reset_post_stats_if_needed(stats: Dict[str, int or float]) -> Dict[str, int or float]:
-    now = time.time()
-    first_ts = stats.get("first_ts", 0)
-    if now - first_ts >= DAILY_SECONDS:
-        return {"first_ts": now, "photos_vids": 0, "texts": 0}
-    return stats
+def _post_slot(user_id: int, now: float) -> int:
+    """Return the user's slot, allocating it or starting a fresh 24h window as needed."""
+    i = USER_POST_IDX.get(user_id)
+    if i is None:
+        i = len(POST_FIRST_TS)
+        USER_POST_IDX[user_id] = i
+        POST_FIRST_TS.append(now)
+        POST_MEDIA.append(0)
+        POST_TEXT.append(0)
+    elif now - POST_FIRST_TS[i] >= DAILY_SECONDS:
+        POST_FIRST_TS[i] = now
+        POST_MEDIA[i] = 0
+        POST_TEXT[i] = 0
+    return i
 
 
 def is_post_allowed(user_id: int, kind: str) -> Tuple[bool, int]:
@@ -254,52 +543,103 @@ def is_post_allowed(user_id: int, kind: str) -> Tuple[bool, int]:
     kind: "media" or "text"
     Returns (allowed, remaining_count)
     """
-    now = time.time()
-    stats = USER_POST_STATS.get(user_id)
-    if not stats:
+    limit = MAX_PHOTO_VIDEO_PER_DAY if kind == "media" else MAX_TEXT_PER_DAY
+    if user_id not in USER_POST_IDX:
         # allowed full quota
-        remaining = MAX_PHOTO_VIDEO_PER_DAY if kind == "media" else MAX_TEXT_PER_DAY
-        return True, remaining
-    stats = _reset_post_stats_if_needed(stats)
-    USER_POST_STATS[user_id] = stats
-    if kind == "media":
-        used = stats.get("photos_vids", 0)
-        if used >= MAX_PHOTO_VIDEO_PER_DAY:
-            remaining_seconds = int(DAILY_SECONDS - (now - stats["first_ts"]))
-            return False, remaining_seconds
-        return True, MAX_PHOTO_VIDEO_PER_DAY - used
-    else:
-        used = stats.get("texts", 0)
-        if used >= MAX_TEXT_PER_DAY:
-            remaining_seconds = int(DAILY_SECONDS - (now - stats["first_ts"]))
-            return False, remaining_seconds
-        return True, MAX_TEXT_PER_DAY - used
+        return True, limit
+    now = time.time()
+    i = _post_slot(user_id, now)
+    used = POST_MEDIA[i] if kind == "media" else POST_TEXT[i]
+    if used >= limit:
+        remaining_seconds = int(DAILY_SECONDS - (now - POST_FIRST_TS[i]))
+        return False, remaining_seconds
+    return True, limit - used
 
 
 def increment_post_count(user_id: int, kind: str):
-    now = time.time()
-    stats = USER_POST_STATS.get(user_id)
-    if not stats:
-        stats = {"first_ts": now, "photos_vids": 0, "texts": 0}
-        USER_POST_STATS[user_id] = stats
-    else:
-        stats = _reset_post_stats_if_needed(stats)
-        USER_POST_STATS[user_id] = stats
+    i = _post_slot(user_id, time.time())
     if kind == "media":
-        stats["photos_vids"] = stats.get("photos_vids", 0) + 1
+        POST_MEDIA[i] += 1
     else:
-        stats["texts"] = stats.get("texts", 0) + 1
+        POST_TEXT[i] += 1
+    POST_STATS_DIRTY.add(user_id)
 
 
 def decrement_post_count_on_failure(user_id: int, kind: str):
-    stats = USER_POST_STATS.get(user_id)
-    if not stats:
+    i = USER_POST_IDX.get(user_id)
+    if i is None:
         return
-    key = "photos_vids" if kind == "media" else "texts"
-    if stats.get(key, 0) <= 1:
-        stats[key] = 0
+    counts = POST_MEDIA if kind == "media" else POST_TEXT
+    if counts[i] <= 1:
+        counts[i] = 0
     else:
-        stats[key] -= 1
+        counts[i] -= 1
+    POST_STATS_DIRTY.add(user_id)
+
+
+async def flush_post_stats():
+    """Write every dirty quota slot to post_stats in one executemany/commit."""
+    if not POST_STATS_DIRTY:
+        return
+    rows = []
+    for uid in POST_STATS_DIRTY:
+        i = USER_POST_IDX.get(uid)
+        if i is not None:
+            rows.append((uid, POST_FIRST_TS[i], POST_MEDIA[i], POST_TEXT[i]))
+    POST_STATS_DIRTY.clear()
+    try:
+        await db_exec_many(
+            "INSERT OR REPLACE INTO post_stats (user_id, first_ts, photos_vids, texts) VALUES (?,?,?,?)", rows
+        )
+    except Exception:
+        logger.exception("Gagal menyimpan post_stats")
+        POST_STATS_DIRTY.update(r[0] for r in rows)
+
+
+async def post_stats_flusher():
+    while True:
+        await asyncio.sleep(POST_STATS_FLUSH_SECONDS)
+        await flush_post_stats()
+
+
+def sweep_expired_stats(now: Optional[float] = None) -> int:
+    """
+    Drop download/post quota entries whose 24h window has passed, so the in-memory
+    state stays O(active users). Post slots are compacted. Returns entries removed.
+    """
+    now = now or time.time()
+    removed = 0
+    for uid, stats in list(USER_DAILY_STATS.items()):
+        if now - stats["first_ts"] >= DAILY_SECONDS:
+            del USER_DAILY_STATS[uid]
+            removed += 1
+
+    live = [(uid, i) for uid, i in USER_POST_IDX.items() if now - POST_FIRST_TS[i] < DAILY_SECONDS]
+    if len(live) != len(USER_POST_IDX):
+        removed += len(USER_POST_IDX) - len(live)
+        POST_FIRST_TS[:] = array("d", (POST_FIRST_TS[i] for _, i in live))
+        POST_MEDIA[:] = array("i", (POST_MEDIA[i] for _, i in live))
+        POST_TEXT[:] = array("i", (POST_TEXT[i] for _, i in live))
+        USER_POST_IDX.clear()
+        USER_POST_IDX.update((uid, n) for n, (uid, _) in enumerate(live))
+        POST_STATS_DIRTY.intersection_update(USER_POST_IDX)
+    return removed
+
+
+async def stats_sweeper():
+    while True:
+        await asyncio.sleep(STATS_SWEEP_SECONDS)
+        removed = sweep_expired_stats()
+        cutoff = time.time() - MEMBER_STATUS_TTL
+        for key, (_, fetched_at) in list(MEMBER_STATUS_CACHE.items()):
+            if fetched_at < cutoff:
+                del MEMBER_STATUS_CACHE[key]
+        if removed:
+            logger.info("Sweeper: %d entri kuota kedaluwarsa dihapus", removed)
+        try:
+            await db_exec("DELETE FROM post_stats WHERE first_ts <= ?", (time.time() - DAILY_SECONDS,))
+        except Exception:
+            logger.exception("Gagal membersihkan post_stats")
 
 
 # ======================
@@ -311,8 +651,8 @@ async def send_to_log_channel(context: ContextTypes.DEFAULT_TYPE, msg: Message,
     user = msg.from_user
     username = f"@{user.username}" if user.username else "(no username)"
     name = user.first_name or "-"
-    # Escape user-supplied content to avoid HTML injection
-    user_text = escape_html((msg.caption or msg.text or ""))
+    # PTB renders the user's own entities (bold, links, ...) as already-escaped HTML
+    user_text = msg.caption_html_urled or msg.text_html_urled or ""
     log_caption = (
         f"👤 <b>Nama:</b> {escape_html(name)}\n"
         f"🔗 <b>Username:</b> {escape_html(username)}\n"
@@ -321,28 +661,40 @@ async def send_to_log_channel(context: ContextTypes.DEFAULT_TYPE, msg: Message,
         f"{user_text}"
     )
     try:
-        if getattr(msg, "photo", None):
-            await context.bot.send_photo(chat_id=LOG_CHANNEL_ID, photo=msg.photo[-1].file_id, caption=log_caption, parse_mode=ParseMode.HTML)
-        elif getattr(msg, "video", None):
-            await context.bot.send_video(chat_id=LOG_CHANNEL_ID, video=msg.video.file_id, caption=log_caption, parse_mode=ParseMode.HTML)
+        if msg.photo or msg.video:
+            # copy the original message server-side, swapping in the log caption
+            await context.bot.copy_message(
+                chat_id=LOG_CHANNEL_ID,
+                from_chat_id=msg.chat_id,
+                message_id=msg.message_id,
+                caption=log_caption,
+                parse_mode=ParseMode.HTML,
+                disable_notification=True,
+            )
         else:
-            await context.bot.send_message(chat_id=LOG_CHANNEL_ID, text=log_caption, parse_mode=ParseMode.HTML)
+            await context.bot.send_message(chat_id=LOG_CHANNEL_ID, text=log_caption, parse_mode=ParseMode.HTML, disable_notification=True)
     except Exception:
         logger.exception("Gagal mengirim log")
 
 
+# menfess logs are delivered by a single background worker so they reach the
+# log channel in posting order, without the handler awaiting them
+LOG_QUEUE: asyncio.Queue = asyncio.Queue()
+
+
+async def log_channel_worker():
+    while True:
+        context, msg, gender = await LOG_QUEUE.get()
+        await send_to_log_channel(context, msg, gender)
+
+
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     msg = update.message
     if not msg or not msg.from_user or msg.from_user.is_bot:
         return
 
-    text_lower = (msg.text or msg.caption or "").lower()
-
-    gender = None
-    for tag in TAGS:
-        if tag in text_lower:
-            gender = tag.replace("#", "")
-            break
+    m = TAG_RE.search(msg.text or msg.caption or "")
+    gender = m.group(1).lower() if m else None
 
     if not gender:
         await msg.reply_text("❌ Post ditolak.\nWajib pakai #pria atau #wanita")
@@ -352,7 +704,9 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     username = msg.from_user.username
 
     # Determine whether this is media (photo/video) or text-only
-    is_media = bool(getattr(msg, "photo", None) or getattr(msg, "video", None))
+    photo = msg.photo
+    video = msg.video
+    is_media = bool(photo or video)
 
     # Check posting limits per user
     kind = "media" if is_media else "text"
@@ -366,25 +720,26 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    with db:
-        cur = db.cursor()
-        cur.execute("SELECT gender FROM users WHERE user_id=?", (user_id,))
-        row = cur.fetchone()
-        if row and row[0] != gender:
-            await msg.reply_text(f"❌ Post ditolak.\nGender akun kamu sudah tercatat sebagai #{row[0]}.")
-            return
-        if not row:
-            cur.execute("INSERT INTO users (user_id, username, gender) VALUES (?,?,?)", (user_id, username, gender))
+    # gender is write-once: USER_GENDER holds every registered user, so a miss means a new user
+    known = USER_GENDER.get(user_id)
+    if known is None:
+        await db_exec(
+            "INSERT OR IGNORE INTO users (user_id, username, gender) VALUES (?, ?, ?)", (user_id, username, gender)
+        )
+        known = USER_GENDER[user_id] = gender
+    if known != gender:
+        await msg.reply_text(f"❌ Post ditolak.\nGender akun kamu sudah tercatat sebagai #{known}.")
+        return
 
     caption = msg.text or msg.caption or ""
     # Attempt to send to public channel, only increment count if success
     try:
-        if getattr(msg, "photo", None):
-            await context.bot.send_photo(chat_id=CHANNEL_ID, photo=msg.photo[-1].file_id, caption=caption)
+        if photo:
+            await context.bot.send_photo(chat_id=CHANNEL_ID, photo=photo[-1].file_id, caption=caption)
             # success -> increment media count
             increment_post_count(user_id, "media")
-        elif getattr(msg, "video", None):
-            await context.bot.send_video(chat_id=CHANNEL_ID, video=msg.video.file_id, caption=caption)
+        elif video:
+            await context.bot.send_video(chat_id=CHANNEL_ID, video=video.file_id, caption=caption)
             increment_post_count(user_id, "media")
         else:
             await context.bot.send_message(chat_id=CHANNEL_ID, text=caption)
@@ -393,10 +748,23 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await msg.reply_text(f"❌ Gagal mengirim ke channel publik: {e}")
         return
 
-    await send_to_log_channel(context, msg, gender)
+    # logging is best-effort, don't make the user wait for it
+    LOG_QUEUE.put_nowait((context, msg, gender))
     await msg.reply_text("✅ Post berhasil dikirim.")
 
 
+WELCOME_TEMPLATE = (
+    "👋 Selamat datang <b>{name}</b>!\n\n"
+    "📌 <b>Peraturan Grup:</b>\n"
+    "• No rasis 🚫\n"
+    "• Jangan spam 🚫\n"
+    "• Post menfess via bot\n\n"
+    "🔗 Bot menfess: @sixafter_bot\n"
+    "🔗 Channel menfess: https://t.me/sixafter0\n\n"
+    "Semoga betah ya 😊"
+)
+
+
 async def welcome_new_member(update: Update, context: ContextTypes.DEFAULT_TYPE):
     msg = update.message
     if not msg:
@@ -407,33 +775,36 @@ async def welcome_new_member(update: Update, context: ContextTypes.DEFAULT_TYPE)
     except Exception:
         pass
 
-    for user in msg.new_chat_members:
-        if user.is_bot:
-            continue
-        user_id = user.id
-        with db:
-            cur = db.cursor()
-            cur.execute("SELECT 1 FROM welcomed_users WHERE user_id=? AND chat_id=?", (user_id, chat_id))
-            if cur.fetchone():
-                continue
-            cur.execute("INSERT INTO welcomed_users (user_id, chat_id) VALUES (?, ?)", (user_id, chat_id))
+    for u in msg.new_chat_members:
+        forget_member_status(chat_id, u.id)
+
+    # WELCOMED_USERS mirrors the table, so no SELECT; one executemany/commit per join event
+    candidates = {u.id: u for u in msg.new_chat_members if not u.is_bot and (u.id, chat_id) not in WELCOMED_USERS}
+    if not candidates:
+        return
+    await db_exec_many(
+        "INSERT OR IGNORE INTO welcomed_users (user_id, chat_id) VALUES (?, ?)", [(uid, chat_id) for uid in candidates]
+    )
+    # only after the write succeeded, so the set never claims rows the table lacks
+    WELCOMED_USERS.update((uid, chat_id) for uid in candidates)
 
+    for user in candidates.values():
         await context.bot.send_message(
             chat_id=chat_id,
-            text=(
-                f"👋 Selamat datang <b>{escape_html(user.first_name or '')}</b>!\n\n"
-                "📌 <b>Peraturan Grup:</b>\n"
-                "• No rasis 🚫\n"
-                "• Jangan spam 🚫\n"
-                "• Post menfess via bot\n\n"
-                "🔗 Bot menfess: @sixafter_bot\n"
-                "🔗 Channel menfess: https://t.me/sixafter0\n\n"
-                "Semoga betah ya 😊"
-            ),
+            text=WELCOME_TEMPLATE.format(name=escape_html(user.first_name or "")),
             parse_mode=ParseMode.HTML,
         )
 
 
+async def track_member_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Keep MEMBER_STATUS_CACHE current from pushed chat_member updates (promote/demote/leave)."""
+    cmu = update.chat_member
+    if not cmu:
+        return
+    new = cmu.new_chat_member
+    MEMBER_STATUS_CACHE[(cmu.chat.id, new.user.id)] = (new.status, time.time())
+
+
 async def anti_link(update: Update, context: ContextTypes.DEFAULT_TYPE):
     msg = update.message
     if not msg or not msg.from_user:
@@ -442,11 +813,8 @@ async def anti_link(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat = msg.chat
     if user.is_bot:
         return
-    try:
-        member = await context.bot.get_chat_member(chat.id, user.id)
-    except Exception:
-        member = None
-    if member and member.status in ("administrator", "creator"):
+    status = await get_member_status(context.bot, chat.id, user.id)
+    if status in PRIVILEGED_STATUSES:
         return
     try:
         await msg.delete()
@@ -477,11 +845,8 @@ async def unban_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if chat.type not in ("group", "supergroup"):
         await msg.reply_text("Perintah ini hanya untuk grup.")
         return
-    try:
-        member = await context.bot.get_chat_member(chat.id, user.id)
-    except Exception:
-        member = None
-    if user.id != OWNER_ID and (not member or member.status not in ("administrator", "creator")):
+    status = await get_member_status(context.bot, chat.id, user.id)
+    if not is_privileged(user.id, status):
         await msg.reply_text("❌ Hanya pemilik grup atau admin yang bisa menggunakan perintah ini.")
         return
     args = context.args
@@ -495,6 +860,7 @@ async def unban_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     try:
         await context.bot.unban_chat_member(chat_id=chat.id, user_id=target_user_id)
+        forget_member_status(chat.id, target_user_id)
         await msg.reply_text(f"✅ User {target_user_id} telah di-unban.")
     except Exception as e:
         await msg.reply_text(f"❌ Gagal unban: {str(e)}")
@@ -509,11 +875,8 @@ async def ban_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if chat.type not in ("group", "supergroup"):
         await msg.reply_text("Perintah /ban hanya untuk grup.")
         return
-    try:
-        member = await context.bot.get_chat_member(chat.id, user.id)
-    except Exception:
-        member = None
-    if user.id != OWNER_ID and (not member or member.status not in ("administrator", "creator")):
+    status = await get_member_status(context.bot, chat.id, user.id)
+    if not is_privileged(user.id, status):
         await msg.reply_text("❌ Hanya admin atau pemilik grup yang dapat menggunakan /ban.")
         return
     if not context.args:
@@ -535,6 +898,7 @@ async def ban_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
         until_date = int(time.time() + hours * 3600)
     try:
         await context.bot.ban_chat_member(chat_id=chat.id, user_id=target_user_id, until_date=until_date)
+        forget_member_status(chat.id, target_user_id)
         if until_date:
             await msg.reply_text(f"✅ User {target_user_id} diban selama {hours} jam.")
         else:
@@ -553,11 +917,8 @@ async def kick_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if chat.type not in ("group", "supergroup"):
         await msg.reply_text("Perintah /kick hanya untuk grup.")
         return
-    try:
-        member = await context.bot.get_chat_member(chat.id, user.id)
-    except Exception:
-        member = None
-    if user.id != OWNER_ID and (not member or member.status not in ("administrator", "creator")):
+    status = await get_member_status(context.bot, chat.id, user.id)
+    if not is_privileged(user.id, status):
         await msg.reply_text("❌ Hanya admin atau pemilik grup yang dapat menggunakan /kick.")
         return
     target_id = None
@@ -575,6 +936,7 @@ async def kick_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         await context.bot.ban_chat_member(chat_id=chat.id, user_id=target_id, until_date=int(time.time() + 30))
         await context.bot.unban_chat_member(chat_id=chat.id, user_id=target_id)
+        forget_member_status(chat.id, target_id)
         await msg.reply_text(f"✅ User {target_id} telah dikick (di-remove).")
     except Exception as e:
         logger.exception("Gagal kick: %s", e)
@@ -585,6 +947,142 @@ async def kick_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # DOWNLOAD FLOW (yt_dlp + image support)
 # ======================
 
+IMAGE_SEGMENT_SIZE = 4 * 1024 * 1024  # files above this are fetched as parallel ranged GETs
+IMAGE_SEGMENT_CONCURRENCY = 4  # max in-flight ranges per image, keeps CDNs from banning us
+IMAGE_SPOOL_MAX = 8 * 1024 * 1024  # fallback downloads up to this size are kept in memory
+
+
+def parts_generator(size: int, part_size: int = IMAGE_SEGMENT_SIZE):
+    """Yield inclusive (start, end) byte ranges covering `size` bytes."""
+    for start in range(0, size, part_size):
+        yield start, min(start + part_size, size) - 1
+
+
+async def get_content_length(sess, url: str) -> Tuple[Optional[int], bool]:
+    """HEAD the url. Returns (content_length, accepts_ranges); (None, False) if unknown."""
+    try:
+        async with sess.head(url, allow_redirects=True, timeout=10) as resp:
+            if resp.status != 200:
+                return None, False
+            accepts_ranges = resp.headers.get("Accept-Ranges", "").lower() == "bytes"
+            return resp.content_length, accepts_ranges
+    except Exception:
+        return None, False
+
+
+async def _fetch_range(sess, url: str, fd: int, start: int, end: int, sem: asyncio.Semaphore):
+    async with sem:
+        async with sess.get(url, headers={"Range": f"bytes={start}-{end}"}, timeout=30) as resp:
+            if resp.status != 206:
+                raise RuntimeError(f"HTTP {resp.status} (range {start}-{end})")
+            offset = start
+            async for chunk in resp.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                if offset + len(chunk) > end + 1:
+                    raise RuntimeError("Server mengirim data melebihi range")
+                await asyncio.to_thread(os.pwrite, fd, chunk, offset)
+                offset += len(chunk)
+            if offset != end + 1:
+                raise RuntimeError(f"Range {start}-{end} tidak lengkap")
+
+
+async def _fetch_stream(sess, url: str, tmpf) -> Optional[int]:
+    async with sess.get(url, timeout=30) as resp:
+        if resp.status != 200:
+            raise RuntimeError(f"HTTP {resp.status}")
+        if resp.content_length and resp.content_length > TELEGRAM_MAX_BYTES:
+            return None
+        # stream to disk chunk by chunk instead of holding the whole body in RAM;
+        # the running total also catches servers that lie about Content-Length
+        total = 0
+        async for chunk in resp.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+            total += len(chunk)
+            if total > TELEGRAM_MAX_BYTES:
+                return None
+            await asyncio.to_thread(tmpf.write, chunk)
+        return total
+
+
+async def fetch_image(sess, url: str, tmpf) -> Optional[int]:
+    """
+    Download `url` into the open binary (possibly spooled) temp file `tmpf`.
+    Large files on servers that support Range are fetched as parallel segments.
+    Returns bytes written, or None if the file exceeds TELEGRAM_MAX_BYTES.
+    """
+    size, accepts_ranges = await get_content_length(sess, url)
+    if size and size > TELEGRAM_MAX_BYTES:
+        return None
+    if not (accepts_ranges and size and size > IMAGE_SEGMENT_SIZE):
+        return await _fetch_stream(sess, url, tmpf)
+    fd = tmpf.fileno()  # on a spooled file this moves it to disk first
+    tmpf.truncate(size)
+    sem = asyncio.Semaphore(IMAGE_SEGMENT_CONCURRENCY)
+    # wait for every range before the caller can close the fd, then surface the first failure
+    results = await asyncio.gather(
+        *(_fetch_range(sess, url, fd, start, end, sem) for start, end in parts_generator(size)),
+        return_exceptions=True,
+    )
+    for res in results:
+        if isinstance(res, BaseException):
+            raise res
+    return size
+
+
+async def send_image_from_url(bot, sess: aiohttp.ClientSession, user_id: int, url: str) -> bool:
+    """Download the image ourselves and upload it. Returns False if it is over the size limit."""
+    filename = "image" + (Path(url.split("?", 1)[0]).suffix or ".jpg")
+    # download spools in RAM up to IMAGE_SPOOL_MAX (ranged downloads go to disk via fileno())
+    with tempfile.SpooledTemporaryFile(max_size=IMAGE_SPOOL_MAX) as tmpf:
+        size = await fetch_image(sess, url, tmpf)
+        if size is None:
+            return False
+        tmpf.seek(0)
+        if size <= IMAGE_SPOOL_MAX:
+            # upload small images as bytes: handing the spool to httpx would call fileno(),
+            # which rolls it over to a disk file just for the send
+            data = tmpf.read()
+            try:
+                await bot.send_photo(chat_id=user_id, photo=data, filename=filename)
+            except Exception:
+                await bot.send_document(chat_id=user_id, document=data, filename=filename)
+            return True
+        # large files: same handle, no reopen; stream_file() streams it instead of buffering it
+        try:
+            await bot.send_photo(chat_id=user_id, photo=stream_file(tmpf, filename))
+        except Exception:
+            tmpf.seek(0)
+            await bot.send_document(chat_id=user_id, document=stream_file(tmpf, filename))
+    return True
+
+
+# fast accept for the common hosts; anything else must match a dedicated yt-dlp extractor
+SUPPORTED_HOSTS_RE = re.compile(
+    r"(?:^|\.)(?:youtube\.com|youtu\.be|tiktok\.com|instagram\.com|twitter\.com|x\.com|facebook\.com|fb\.watch|reddit\.com)$",
+    re.IGNORECASE,
+)
+# direct links to media files, which yt-dlp's generic extractor downloads as-is
+MEDIA_EXT_RE = re.compile(
+    r"[^?#]*\.(?:mp4|m4v|mkv|webm|mov|avi|flv|3gp|mp3|m4a|aac|ogg|oga|opus|wav|flac|m3u8)(?:[?#]|$)", re.IGNORECASE
+)
+# yt-dlp site extractors minus Generic; filled once by load_ydl_extractors() in post_init
+_YDL_EXTRACTORS: list = []
+
+
+def load_ydl_extractors():
+    from yt_dlp.extractor import gen_extractor_classes
+
+    _YDL_EXTRACTORS[:] = [ie for ie in gen_extractor_classes() if ie.ie_key() != "Generic"]
+
+
+def is_supported_video_url(url: str) -> bool:
+    """
+    True if url is a direct media file or yt-dlp has a site extractor for it. Other pages
+    would only reach the generic extractor, which fails after seconds of network probing.
+    """
+    host = urlsplit(url if "://" in url else "http://" + url).hostname or ""
+    if SUPPORTED_HOSTS_RE.search(host) or MEDIA_EXT_RE.match(url):
+        return True
+    return any(ie.suitable(url) for ie in _YDL_EXTRACTORS)
+
 
 async def download_video(update: Update, context: ContextTypes.DEFAULT_TYPE):
     msg = update.message
@@ -604,54 +1102,28 @@ async def download_video(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
 
         await msg.reply_text("⏳ Mengunduh foto...")
-        tmpf_name = None
+        increment_user_count(user_id)
         try:
-            import aiohttp
-
-            async with aiohttp.ClientSession() as sess:
-                async with sess.get(url, timeout=30) as resp:
-                    if resp.status != 200:
-                        raise RuntimeError(f"HTTP {resp.status}")
-                    content_length = resp.headers.get("Content-Length")
-                    if content_length and int(content_length) > 50 * 1024 * 1024:
-                        await msg.reply_text("❌ Foto lebih besar dari 50MB, tidak dapat dikirim.")
-                        return
-                    data = await resp.read()
-                    if len(data) > 50 * 1024 * 1024:
-                        await msg.reply_text("❌ Foto lebih besar dari 50MB, tidak dapat dikirim.")
-                        return
-                    tmpf = tempfile.NamedTemporaryFile(delete=False, suffix=Path(url).suffix or ".jpg")
-                    tmpf.write(data)
-                    tmpf.flush()
-                    tmpf.close()
-                    tmpf_name = tmpf.name
-
-            increment_user_count(user_id)
             try:
-                # ensure file descriptor is closed and use with to auto-close file object used by PTB
-                with open(tmpf_name, "rb") as fh:
-                    try:
-                        await context.bot.send_photo(chat_id=user_id, photo=fh)
-                    except Exception:
-                        fh.seek(0)
-                        await context.bot.send_document(chat_id=user_id, document=fh)
-                await msg.reply_text("✅ Foto berhasil dikirim.")
-            except Exception:
-                decrement_user_count_on_failure(user_id)
-                raise
+                # let Telegram fetch the URL server-side: no image bytes pass through the bot
+                await context.bot.send_photo(chat_id=user_id, photo=url)
+            except BadRequest:
+                # Telegram couldn't fetch it (too big for URL upload, blocked host, ...)
+                if not await send_image_from_url(context.bot, context.bot_data["http"], user_id, url):
+                    decrement_user_count_on_failure(user_id)
+                    await msg.reply_text("❌ Foto lebih besar dari 50MB, tidak dapat dikirim.")
+                    return
+            await msg.reply_text("✅ Foto berhasil dikirim.")
         except Exception as e:
             decrement_user_count_on_failure(user_id)
             logger.exception("Gagal mengunduh foto: %s", e)
             await msg.reply_text(f"❌ Gagal mengunduh foto: {e}")
-        finally:
-            try:
-                if tmpf_name and os.path.exists(tmpf_name):
-                    os.unlink(tmpf_name)
-            except Exception:
-                pass
         return
 
-    # otherwise video/audio flow
+    # otherwise video/audio flow; reject links yt-dlp has no extractor for before offering qualities
+    if not await asyncio.to_thread(is_supported_video_url, url):
+        await msg.reply_text("❌ Situs tidak didukung untuk download video/audio.")
+        return
     context.user_data["download_url"] = url
     keyboard = [
         [InlineKeyboardButton("360p", callback_data="q_360"), InlineKeyboardButton("720p", callback_data="q_720")],
@@ -661,6 +1133,49 @@ async def download_video(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await msg.reply_text("Pilih kualitas download:", reply_markup=reply_markup)
 
 
+# yt-dlp option templates, built once; only "outtmpl" changes per download
+YDL_BASE_OPTS = {"quiet": True, "no_warnings": True, "noplaylist": True}
+
+
+def _video_opts(max_h: int) -> dict:
+    if FFMPEG_AVAILABLE:
+        fmt = f"bestvideo[height<={max_h}]+bestaudio/best[height<={max_h}]"
+        return {**YDL_BASE_OPTS, "format": fmt, "merge_output_format": "mp4"}
+    return {**YDL_BASE_OPTS, "format": "best"}
+
+
+YDL_OPTS = {
+    "q_360": _video_opts(360),
+    "q_720": _video_opts(720),
+    "q_mp3": {
+        **YDL_BASE_OPTS,
+        "format": "bestaudio/best",
+        "postprocessors": [{"key": "FFmpegExtractAudio", "preferredcodec": "mp3", "preferredquality": "192"}],
+    },
+}
+
+# Idle YoutubeDL instances per quality key, shared by the download threads. A YoutubeDL
+# object is not safe to share between concurrent downloads, so each job borrows one
+# exclusively and returns it (list pop/append are atomic, so no lock is needed).
+_YDL_CACHE: dict[str, list] = {key: [] for key in YDL_OPTS}
+
+
+def run_ydl(quality: str, url: str, out_template: str):
+    idle = _YDL_CACHE[quality]
+    try:
+        ydl = idle.pop()
+    except IndexError:
+        ydl = YoutubeDL(dict(YDL_OPTS[quality]))
+    ydl.params["outtmpl"] = {"default": out_template}
+    try:
+        ydl.download([url])
+    except Exception:
+        # don't recycle an instance left in an unknown state
+        ydl.close()
+        raise
+    idle.append(ydl)
+
+
 async def quality_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     if not query:
@@ -680,70 +1195,72 @@ async def quality_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not allowed:
         await query.edit_message_text("😅 Kuota download hari ini sudah habis\n\n" f"⏳ Reset dalam {human_time(remaining)}\n" f"📅 Limit: {MAX_DAILY} download / hari")
         return
-    await query.edit_message_text("⏳ Mengunduh, mohon tunggu...")
+    if data == "q_mp3" and not FFMPEG_AVAILABLE:
+        await query.edit_message_text("⚠️ Konversi ke MP3 memerlukan ffmpeg yang tidak tersedia di server. Pilih video atau gunakan Docker.")
+        return
+    quality = data if data in YDL_OPTS else "q_720"
+
+    # claim the per-user slot and quota before queueing, so a second tap can't double-book
+    USER_ACTIVE_DOWNLOAD.add(user_id)
+    increment_user_count(user_id)
+    # PTB handles updates one at a time: run the job detached so other updates (and
+    # other users' downloads, up to DL_CONCURRENCY) keep flowing while it runs
+    spawn(run_download(context.bot, context.bot_data["dl_pool"], query, user_id, quality, url))
+
+
+async def run_download(bot, pool, query, user_id: int, quality: str, url: str):
     tmpdir = None
     try:
+        # all DL_CONCURRENCY slots busy with other users' jobs: tell the user they are queued
+        queued = download_lock.locked()
+        if queued:
+            await query.edit_message_text("⏳ Antrean download penuh, menunggu giliran...")
+        else:
+            await query.edit_message_text("⏳ Mengunduh, mohon tunggu...")
+        tmpdir = tempfile.mkdtemp(prefix="yt-dl-")
+        out_template = str(Path(tmpdir) / "output.%(ext)s")
+
+        # only the yt-dlp job itself holds a download slot; sending happens outside it
         async with download_lock:
-            USER_ACTIVE_DOWNLOAD.add(user_id)
-            increment_user_count(user_id)
-            tmpdir = tempfile.mkdtemp(prefix="yt-dl-")
-            out_template = str(Path(tmpdir) / "output.%(ext)s")
-            ffmpeg_available = shutil.which("ffmpeg") is not None
-
-            if data == "q_mp3":
-                if not ffmpeg_available:
-                    await query.edit_message_text("⚠️ Konversi ke MP3 memerlukan ffmpeg yang tidak tersedia di server. Pilih video atau gunakan Docker.")
-                    decrement_user_count_on_failure(user_id)
-                    return
-                ydl_opts = {"format": "bestaudio/best", "outtmpl": out_template, "quiet": True, "no_warnings": True, "noplaylist": True, "postprocessors": [{"key": "FFmpegExtractAudio", "preferredcodec": "mp3", "preferredquality": "192"}],}
-            else:
-                max_h = 360 if data == "q_360" else 720
-                if ffmpeg_available:
-                    fmt = f"bestvideo[height<={max_h}]+bestaudio/best[height<={max_h}]"
-                    ydl_opts = {"format": fmt, "outtmpl": out_template, "merge_output_format": "mp4", "quiet": True, "no_warnings": True, "noplaylist": True}
-                else:
-                    fmt = "best"
-                    ydl_opts = {"format": fmt, "outtmpl": out_template, "quiet": True, "no_warnings": True, "noplaylist": True}
-
-            def run_ydl():
-                with YoutubeDL(ydl_opts) as ydl:
-                    ydl.download([url])
-
-            await asyncio.to_thread(run_ydl)
-
-            files = list(Path(tmpdir).iterdir())
-            if not files:
-                raise RuntimeError("Download gagal — tidak ada file output dari yt-dlp.")
-            files_sorted = sorted(files, key=lambda p: p.stat().st_size, reverse=True)
-            output_file = files_sorted[0]
-            size_bytes = output_file.stat().st_size
-            logger.info("Downloaded file: %s (%d bytes)", output_file, size_bytes)
-
-            TELEGRAM_MAX_BYTES = 50 * 1024 * 1024
-            if size_bytes > TELEGRAM_MAX_BYTES:
-                await query.edit_message_text("❌ File lebih besar dari 50MB sehingga tidak dapat dikirim melalui Bot Telegram.\nSilakan unduh langsung dari sumber (link) atau gunakan metode lain.")
-                decrement_user_count_on_failure(user_id)
-                return
+            if queued:
+                await query.edit_message_text("⏳ Mengunduh, mohon tunggu...")
+            # yt-dlp is network/subprocess bound (ffmpeg runs as its own process), so a thread suffices
+            await asyncio.get_running_loop().run_in_executor(pool, run_ydl, quality, url, out_template)
+
+        # single scandir pass: one stat per file, no intermediate Path objects
+        with os.scandir(tmpdir) as it:
+            entries = [(e.path, e.stat(follow_symlinks=False).st_size) for e in it if e.is_file(follow_symlinks=False)]
+        if not entries:
+            raise RuntimeError("Download gagal — tidak ada file output dari yt-dlp.")
+        output_path, size_bytes = max(entries, key=lambda t: t[1])
+        output_file = Path(output_path)
+        logger.info("Downloaded file: %s (%d bytes)", output_file, size_bytes)
+
+        if size_bytes > TELEGRAM_MAX_BYTES:
+            await query.edit_message_text("❌ File lebih besar dari 50MB sehingga tidak dapat dikirim melalui Bot Telegram.\nSilakan unduh langsung dari sumber (link) atau gunakan metode lain.")
+            decrement_user_count_on_failure(user_id)
+            return
 
-            suffix = output_file.suffix.lower()
+        suffix = output_file.suffix.lower()
+        try:
+            # Use file-like objects to ensure file descriptors are closed after sending;
+            # stream_file() lets the HTTP client read them in chunks during upload
+            with open(output_file, "rb") as fh:
+                if suffix in (".mp4", ".mkv", ".webm", ".mov"):
+                    await bot.send_video(chat_id=user_id, video=stream_file(fh))
+                elif suffix in (".mp3", ".m4a", ".aac", ".opus"):
+                    await bot.send_audio(chat_id=user_id, audio=stream_file(fh))
+                else:
+                    await bot.send_document(chat_id=user_id, document=stream_file(fh))
+        except Exception:
             try:
-                # Use file-like objects to ensure file descriptors are closed after sending
+                # fallback: try sending as document by reopening
                 with open(output_file, "rb") as fh:
-                    if suffix in (".mp4", ".mkv", ".webm", ".mov"):
-                        await context.bot.send_video(chat_id=user_id, video=fh)
-                    elif suffix in (".mp3", ".m4a", ".aac", ".opus"):
-                        await context.bot.send_audio(chat_id=user_id, audio=fh)
-                    else:
-                        await context.bot.send_document(chat_id=user_id, document=fh)
-            except Exception:
-                try:
-                    # fallback: try sending as document by reopening
-                    with open(output_file, "rb") as fh:
-                        await context.bot.send_document(chat_id=user_id, document=fh)
-                except Exception as e:
-                    raise RuntimeError(f"Gagal mengirim file ke pengguna: {e}")
-
-            await query.edit_message_text("✅ Download selesai. File telah dikirim ke chat pribadi.")
+                    await bot.send_document(chat_id=user_id, document=stream_file(fh))
+            except Exception as e:
+                raise RuntimeError(f"Gagal mengirim file ke pengguna: {e}")
+
+        await query.edit_message_text("✅ Download selesai. File telah dikirim ke chat pribadi.")
     except Exception as exc:
         decrement_user_count_on_failure(user_id)
         logger.exception("Error during download: %s", exc)
@@ -764,6 +1281,66 @@ async def quality_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # TAG COMMANDS
 # ======================
 
+TAG_SEND_RATE = 25  # msg/s, under Telegram's ~30 msg/s bot-wide cap
+TAG_SEND_RETRIES = 5
+TAG_SEND_CONCURRENCY = 8  # in-flight tagall batches
+TAGALL_MAX_USERS = 1000
+TAGALL_BATCH_SIZE = 20  # mentions per message
+TAGALL_HEADER = "🔔 Panggilan untuk semua:\n"
+TAGALL_DEFAULT_TEXT = "Perhatian dari admin."
+# same markup as mention_html(uid, "."); bytes %-formatting + one ASCII decode per batch beats str formatting
+TAGALL_MENTION = b'<a href="tg://user?id=%d">.</a>'
+
+
+class AsyncLimiter:
+    """Token bucket: at most `rate` acquisitions per `per` seconds."""
+
+    def __init__(self, rate: int, per: float = 1.0):
+        self.rate = rate
+        self.per = per
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate / self.per)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return self
+                await asyncio.sleep((1 - self._tokens) * self.per / self.rate)
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+tag_limiter = AsyncLimiter(TAG_SEND_RATE)
+
+TAG_TEMPLATE = "🔔 %s\n\n%s"
+TAG_USAGE = "Gunakan: /tag <user_id> <pesan>  atau reply + /tag <pesan>"
+TAG_NO_USERNAME = "Gunakan reply atau user_id. Mention by @username tidak didukung, gunakan reply atau user id."
+
+
+async def send_paced(bot, **kwargs):
+    """send_message through tag_limiter; honours RetryAfter, backs off on network errors."""
+    for attempt in range(TAG_SEND_RETRIES):
+        try:
+            async with tag_limiter:
+                return await bot.send_message(**kwargs)
+        except RetryAfter as e:
+            if attempt == TAG_SEND_RETRIES - 1:
+                raise
+            logger.warning("Flood wait %ss (percobaan %d)", e.retry_after, attempt + 1)
+            await asyncio.sleep(e.retry_after)
+        except (TimedOut, NetworkError) as e:
+            if attempt == TAG_SEND_RETRIES - 1:
+                raise
+            logger.warning("Gangguan jaringan: %s (percobaan %d)", e, attempt + 1)
+            await asyncio.sleep(min(2 ** attempt, 16))
+
 
 async def tag_member(update: Update, context: ContextTypes.DEFAULT_TYPE):
     msg = update.message
@@ -774,11 +1351,8 @@ async def tag_member(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if chat.type not in ("group", "supergroup"):
         await msg.reply_text("Perintah /tag hanya untuk grup.")
         return
-    try:
-        member = await context.bot.get_chat_member(chat.id, user.id)
-    except Exception:
-        member = None
-    if user.id != OWNER_ID and (not member or member.status not in ("administrator", "creator")):
+    status = await get_member_status(context.bot, chat.id, user.id)
+    if not is_privileged(user.id, status):
         await msg.reply_text("❌ Hanya admin atau pemilik grup yang dapat menandai member.")
         return
 
@@ -791,13 +1365,13 @@ async def tag_member(update: Update, context: ContextTypes.DEFAULT_TYPE):
         text_to_send = " ".join(parts) if parts else "(ditandai oleh admin)"
     else:
         if not parts:
-            await msg.reply_text("Gunakan: /tag <user_id> <pesan>  atau reply + /tag <pesan>")
+            await msg.reply_text(TAG_USAGE)
             return
         first = parts[0]
         rest = parts[1:]
         text_to_send = " ".join(rest) if rest else "(ditandai oleh admin)"
         if first.startswith("@"):
-            await msg.reply_text("Gunakan reply atau user_id. Mention by @username tidak didukung, gunakan reply atau user id.")
+            await msg.reply_text(TAG_NO_USERNAME)
             return
         else:
             try:
@@ -807,8 +1381,8 @@ async def tag_member(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 return
 
     try:
-        mention = f'<a href="tg://user?id={target_id}">disini</a>'
-        await context.bot.send_message(chat_id=chat.id, text=f"🔔 {mention}\n\n{text_to_send}", parse_mode=ParseMode.HTML)
+        text = TAG_TEMPLATE % (mention_html(target_id, "disini"), escape_html(text_to_send))
+        await context.bot.send_message(chat_id=chat.id, text=text, parse_mode=ParseMode.HTML)
     except Exception as e:
         logger.exception("Gagal menandai member: %s", e)
         await msg.reply_text(f"❌ Gagal menandai member: {e}")
@@ -823,11 +1397,8 @@ async def tag_all(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if chat.type not in ("group", "supergroup"):
         await msg.reply_text("Perintah /tagall hanya untuk grup.")
         return
-    try:
-        member = await context.bot.get_chat_member(chat.id, user.id)
-    except Exception:
-        member = None
-    if user.id != OWNER_ID and (not member or member.status not in ("administrator", "creator")):
+    status = await get_member_status(context.bot, chat.id, user.id)
+    if not is_privileged(user.id, status):
         await msg.reply_text("❌ Hanya admin atau pemilik grup yang dapat menggunakan /tagall.")
         return
 
@@ -837,39 +1408,76 @@ async def tag_all(update: Update, context: ContextTypes.DEFAULT_TYPE):
     elif msg.reply_to_message and msg.reply_to_message.text:
         custom_text = msg.reply_to_message.text
 
-    with db:
-        cur = db.cursor()
-        cur.execute("SELECT user_id FROM welcomed_users WHERE chat_id=?", (chat.id,))
-        rows = cur.fetchall()
-    user_ids = [r[0] for r in rows if r and isinstance(r[0], int)]
+    # LIMIT MAX+1: enough to tell "too many" without pulling the whole chat
+    rows = await db_read(
+        "SELECT DISTINCT user_id FROM welcomed_users WHERE chat_id=? AND typeof(user_id)='integer' LIMIT ?",
+        (chat.id, TAGALL_MAX_USERS + 1),
+        max_rows=TAGALL_MAX_USERS + 1,
+    )
+    user_ids = [r[0] for r in rows]
     if not user_ids:
         await msg.reply_text("Tidak ada user yang tersimpan untuk ditandai.")
         return
 
-    seen = set()
-    user_ids = [uid for uid in user_ids if not (uid in seen or seen.add(uid))]
-    MAX_TOTAL = 1000
-    if len(user_ids) > MAX_TOTAL:
-        await msg.reply_text(f"⚠️ Terdapat {len(user_ids)} user, terlalu banyak untuk ditag sekaligus.")
+    if len(user_ids) > TAGALL_MAX_USERS:
+        await msg.reply_text(f"⚠️ Terdapat lebih dari {TAGALL_MAX_USERS} user, terlalu banyak untuk ditag sekaligus.")
         return
 
-    batch_size = 20
-    sent_batches = 0
-    try:
-        for i in range(0, len(user_ids), batch_size):
-            batch = user_ids[i : i + batch_size]
-            mentions = " ".join(f'<a href="tg://user?id={uid}">.</a>' for uid in batch)
-            body = custom_text or "Perhatian dari admin."
-            text = f"🔔 Panggilan untuk semua:\n{mentions}\n\n{body}"
-            await context.bot.send_message(chat_id=chat.id, text=text, parse_mode=ParseMode.HTML)
-            sent_batches += 1
-            await asyncio.sleep(1)
-    except Exception as e:
-        logger.exception("Error saat mengirim tagall: %s", e)
-        await msg.reply_text(f"❌ Gagal mengirim tagall: {e}")
+    thread_id = msg.message_thread_id if msg.is_topic_message else None
+    if len(user_ids) <= TAGALL_BATCH_SIZE:
+        # fits in one message: send inline, no background task or progress text
+        text = "%s%s\n\n%s" % (
+            TAGALL_HEADER,
+            b" ".join([TAGALL_MENTION % uid for uid in user_ids]).decode("ascii"),
+            escape_html(custom_text or TAGALL_DEFAULT_TEXT),
+        )
+        try:
+            await send_paced(
+                context.bot, chat_id=chat.id, message_thread_id=thread_id, text=text, parse_mode=ParseMode.HTML
+            )
+        except Exception as e:
+            logger.warning("Tagall gagal: %s", e)
+            await msg.reply_text(f"❌ Gagal mengirim tagall: {e}")
+            return
+        await msg.reply_text(f"✅ Selesai mengirim tag kepada {len(user_ids)} user.")
         return
 
-    await msg.reply_text(f"✅ Selesai mengirim tag kepada {len(user_ids)} user dalam {sent_batches} batch.")
+    await msg.reply_text(f"⏳ Mengirim tag ke {len(user_ids)} user...")
+    # fan-out runs detached so the handler returns right away; summary is posted when done
+    spawn(_tagall_worker(context.bot, chat.id, user_ids, custom_text, thread_id))
+
+
+async def _tagall_worker(bot, chat_id: int, user_ids: list, custom_text: Optional[str], thread_id: Optional[int]):
+    batch_size = TAGALL_BATCH_SIZE
+    all_mentions = [TAGALL_MENTION % uid for uid in user_ids]
+    suffix = "\n\n" + escape_html(custom_text or TAGALL_DEFAULT_TEXT)
+    texts = [
+        TAGALL_HEADER + b" ".join(all_mentions[i : i + batch_size]).decode("ascii") + suffix
+        for i in range(0, len(all_mentions), batch_size)
+    ]
+    sem = asyncio.Semaphore(TAG_SEND_CONCURRENCY)
+
+    async def _send(text):
+        async with sem:
+            await send_paced(bot, chat_id=chat_id, message_thread_id=thread_id, text=text, parse_mode=ParseMode.HTML)
+
+    results = await asyncio.gather(*(_send(t) for t in texts), return_exceptions=True)
+    errors = [r for r in results if isinstance(r, Exception)]
+    sent_batches = len(results) - len(errors)
+    if errors:
+        e = errors[0]
+        # flood/network failures are expected under load: one line, no traceback
+        if isinstance(e, (RetryAfter, NetworkError)):
+            logger.warning("Tagall: %d batch gagal: %s", len(errors), e)
+        else:
+            logger.error("Error saat mengirim tagall: %s", e, exc_info=e)
+        summary = f"❌ Gagal mengirim {len(errors)} dari {len(texts)} batch tagall: {e}"
+    else:
+        summary = f"✅ Selesai mengirim tag kepada {len(user_ids)} user dalam {sent_batches} batch."
+    try:
+        await bot.send_message(chat_id=chat_id, message_thread_id=thread_id, text=summary)
+    except Exception:
+        logger.exception("Gagal mengirim ringkasan tagall")
 
 
 # ======================
@@ -877,6 +1485,30 @@ async def tag_all(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ======================
 
 
+HELP_TEXT_ALL = (
+    "📚 Fitur Bot (lengkap):\n\n"
+    "Member:\n"
+    "- Menfess via private: kirim teks/foto/video dengan tag #pria atau #wanita\n"
+    "- Download video/audio dari hampir semua link (YouTube/TikTok/IG/...) pilih 360p/720p/MP3\n"
+    "- Download foto dari direct image URL\n"
+    "- Batas file dikirim oleh bot: 50 MB\n"
+    f"- Limit download: {MAX_DAILY}x per hari per user\n"
+    f"- Limit menfess per hari: foto/video {MAX_PHOTO_VIDEO_PER_DAY}x, teks {MAX_TEXT_PER_DAY}x\n\n"
+    "Admin (harus admin/owner di grup):\n"
+    "- /tag <user_id> <pesan> atau reply + /tag : menandai 1 member\n"
+    "- /tagall [pesan] : menandai semua member yang tersimpan (batched)\n"
+    "- /ban <user_id> [hours] : ban user (optional durasi dalam jam)\n"
+    "- /kick <user_id> atau reply + /kick : kick user dari grup\n"
+    "- /unban <user_id> : unban user\n\n"
+    "Lainnya:\n"
+    "- Auto welcome untuk member baru (welcome berisi link bot & channel)\n"
+    "- Anti-link di grup (hapus + ban sementara)\n"
+    "- Gunakan /help untuk melihat bantuan ini\n"
+)
+HELP_ADMIN = "Halo Admin!\n\n" + HELP_TEXT_ALL
+HELP_MEMBER = "Halo Member!\n\n" + HELP_TEXT_ALL
+
+
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     msg = update.message
     if not msg:
@@ -884,37 +1516,12 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat = msg.chat
     user = msg.from_user
 
-    all_features = (
-        "📚 Fitur Bot (lengkap):\n\n"
-        "Member:\n"
-        "- Menfess via private: kirim teks/foto/video dengan tag #pria atau #wanita\n"
-        "- Download video/audio dari hampir semua link (YouTube/TikTok/IG/...) pilih 360p/720p/MP3\n"
-        "- Download foto dari direct image URL\n"
-        "- Batas file dikirim oleh bot: 50 MB\n"
-        f"- Limit download: {MAX_DAILY}x per hari per user\n"
-        f"- Limit menfess per hari: foto/video {MAX_PHOTO_VIDEO_PER_DAY}x, teks {MAX_TEXT_PER_DAY}x\n\n"
-        "Admin (harus admin/owner di grup):\n"
-        "- /tag <user_id> <pesan> atau reply + /tag : menandai 1 member\n"
-        "- /tagall [pesan] : menandai semua member yang tersimpan (batched)\n"
-        "- /ban <user_id> [hours] : ban user (optional durasi dalam jam)\n"
-        "- /kick <user_id> atau reply + /kick : kick user dari grup\n"
-        "- /unban <user_id> : unban user\n\n"
-        "Lainnya:\n"
-        "- Auto welcome untuk member baru (welcome berisi link bot & channel)\n"
-        "- Anti-link di grup (hapus + ban sementara)\n"
-        "- Gunakan /help untuk melihat bantuan ini\n"
-    )
     if chat.type in ("group", "supergroup"):
-        try:
-            member = await context.bot.get_chat_member(chat.id, user.id)
-        except Exception:
-            member = None
-        if member and member.status in ("administrator", "creator") or user.id == OWNER_ID:
-            await msg.reply_text("Halo Admin!\n\n" + all_features)
-        else:
-            await msg.reply_text("Halo Member!\n\n" + all_features)
+        status = await get_member_status(context.bot, chat.id, user.id)
+        is_admin = is_privileged(user.id, status)
+        await msg.reply_text(HELP_ADMIN if is_admin else HELP_MEMBER)
     else:
-        await msg.reply_text(all_features)
+        await msg.reply_text(HELP_TEXT_ALL)
 
 
 # ======================
@@ -922,40 +1529,99 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ======================
 
 
+async def post_init(app: Application):
+    # one shared HTTP session: keeps connections/TLS sessions and DNS cache across image downloads
+    app.bot_data["http"] = aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=60),
+        connector=aiohttp.TCPConnector(limit=32, limit_per_host=8, ttl_dns_cache=300, enable_cleanup_closed=True),
+    )
+    # build the extractor list before any link can be checked, so handlers only ever read it
+    await asyncio.to_thread(load_ydl_extractors)
+    # dedicated yt-dlp threads, so long downloads never tie up the default executor used by DB/file I/O
+    app.bot_data["dl_pool"] = ThreadPoolExecutor(max_workers=DL_CONCURRENCY, thread_name_prefix="yt-dlp")
+    spawn(post_stats_flusher())
+    spawn(stats_sweeper())
+    spawn(log_channel_worker())
+
+
+async def post_shutdown(app: Application):
+    for task in list(_background_tasks):
+        task.cancel()
+    await flush_post_stats()
+    http = app.bot_data.pop("http", None)
+    if http is not None:
+        await http.close()
+    pool = app.bot_data.pop("dl_pool", None)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+# handler filters, built once at import
+PRIVATE_FILTER = filters.ChatType.PRIVATE & ~filters.COMMAND
+GROUP_FILTER = filters.ChatType.GROUPS
+
+
+async def private_dispatch(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Single private-chat entry: links go to the downloader, everything else is menfess."""
+    msg = update.message
+    if not msg:
+        return
+    if has_url(msg):
+        await download_video(update, context)
+    else:
+        await handle_message(update, context)
+
+
+async def group_router(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Group messages (handler group 1, after commands): one entity scan decides anti-link."""
+    msg = update.message
+    if msg and has_url(msg):
+        await anti_link(update, context)
+
+
 def main():
     if not BOT_TOKEN:
         logger.error("BOT_TOKEN environment variable is not set.")
         return
 
-    # Ensure no webhook conflicts: attempt to delete webhook at startup (with timeout)
+    # Optional uvloop: libuv-based event loop, cheaper socket/timer handling under many concurrent sends.
+    # run_polling creates its loop from the current policy, so set it before the app runs.
     try:
-        resp = requests.post(f"https://api.telegram.org/bot{BOT_TOKEN}/deleteWebhook", timeout=5)
-        logger.info("deleteWebhook response: %s", resp.text)
-    except Exception as e:
-        logger.exception("Gagal delete webhook: %s", e)
-
-    app = Application.builder().token(BOT_TOKEN).build()
+        import uvloop
+    except ImportError:
+        pass
+    else:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.info("Menggunakan uvloop event loop")
 
-    # PRIVATE menfess handler: exclude messages that contain url/text_link
-    app.add_handler(
-        MessageHandler(filters.ChatType.PRIVATE & ~filters.Entity("url") & ~filters.Entity("text_link") & ~filters.COMMAND, handle_message)
+    # API calls (not getUpdates) share one keep-alive pool sized for the concurrent /tagall + download sends
+    request = HTTPXRequest(
+        connection_pool_size=32, pool_timeout=5.0, connect_timeout=5.0, read_timeout=15.0, write_timeout=15.0
+    )
+    app = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .request(request)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
     )
 
+    # PRIVATE chat (most common update): one handler, entities scanned once to pick menfess vs download
+    app.add_handler(MessageHandler(PRIVATE_FILTER, private_dispatch))
+    app.add_handler(CallbackQueryHandler(quality_callback, pattern="^q_"))
+
+    # Member status pushes (needs the bot to be admin and "chat_member" in allowed_updates)
+    app.add_handler(ChatMemberHandler(track_member_status, ChatMemberHandler.CHAT_MEMBER))
+
     # Welcome new members
     app.add_handler(MessageHandler(filters.StatusUpdate.NEW_CHAT_MEMBERS, welcome_new_member))
 
-    # Anti-link in groups
-    app.add_handler(MessageHandler(filters.ChatType.GROUPS & (filters.Entity("url") | filters.Entity("text_link")), anti_link))
-
     # Moderation
     app.add_handler(CommandHandler("unban", unban_user))
     app.add_handler(CommandHandler("ban", ban_user))
     app.add_handler(CommandHandler("kick", kick_user))
 
-    # Download handlers
-    app.add_handler(MessageHandler(filters.ChatType.PRIVATE & (filters.Entity("url") | filters.Entity("text_link")), download_video))
-    app.add_handler(CallbackQueryHandler(quality_callback, pattern="^q_"))
-
     # Tag commands
     app.add_handler(CommandHandler("tag", tag_member))
     app.add_handler(CommandHandler("tagall", tag_all))
@@ -963,9 +1629,15 @@ def main():
     # HELP
     app.add_handler(CommandHandler("help", help_command))
 
+    # Anti-link in groups: separate handler group so commands in group 0 still run first
+    app.add_handler(MessageHandler(GROUP_FILTER, group_router), group=1)
+
     logger.info("Bot running...")
-    # Use drop_pending_updates=True to discard old updates and avoid processing backlog
-    app.run_polling(drop_pending_updates=True)
+    # run_polling calls deleteWebhook itself (dropping the backlog), so no webhook conflicts
+    # only the update types the handlers above consume; chat_member must be listed explicitly
+    app.run_polling(
+        drop_pending_updates=True, allowed_updates=[Update.MESSAGE, Update.CALLBACK_QUERY, Update.CHAT_MEMBER]
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# bot.py takes its instance lock and opens the DB at import: keep both out of /app/data
+_DATA_DIR = tempfile.mkdtemp(prefix="bot-tests-")
+os.environ["DATA_DIR"] = _DATA_DIR
+os.environ["DB_PATH"] = os.path.join(_DATA_DIR, "users.db")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,57 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+import bot
+
+
+@pytest.fixture
+def stepped():
+    return []
+
+
+@pytest.fixture
+def conn(stepped):
+    c = sqlite3.connect(":memory:")
+    c.execute("CREATE TABLE t (n INTEGER)")
+    c.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(1000)])
+    # called once per row the statement produces, so it shows how far SQLite stepped
+    c.create_function("seen", 1, lambda n: stepped.append(n) or n)
+    yield c
+    c.close()
+
+
+SQL = "SELECT seen(n) FROM t ORDER BY rowid"  # rowid scan: rows are produced lazily, no sort step
+
+
+def test_no_cap_returns_everything(conn):
+    rows = bot._fetchall(conn, SQL, ())
+    assert [r[0] for r in rows] == list(range(1000))
+
+
+@pytest.mark.parametrize("max_rows", [0, 1, 255, 256, 300, 999])
+def test_cap_returns_first_rows_in_order(conn, max_rows):
+    rows = bot._fetchall(conn, SQL, (), max_rows=max_rows)
+    assert [r[0] for r in rows] == list(range(max_rows))
+
+
+def test_cap_above_row_count_returns_everything(conn):
+    assert len(bot._fetchall(conn, SQL, (), max_rows=5000)) == 1000
+
+
+def test_cap_stops_stepping_the_statement(conn, stepped):
+    bot._fetchall(conn, SQL, (), max_rows=300)
+    # at most one fetchmany batch past the cap is read
+    assert len(stepped) <= 300 + bot.DB_FETCH_ARRAYSIZE
+    assert len(stepped) < 1000
+
+
+def test_db_read_passes_the_cap_through():
+    chat_id = -1001
+    bot.db.executemany(
+        "INSERT OR IGNORE INTO welcomed_users (user_id, chat_id) VALUES (?, ?)", [(uid, chat_id) for uid in range(50)]
+    )
+    bot.db.commit()
+    rows = asyncio.run(bot.db_read("SELECT user_id FROM welcomed_users WHERE chat_id=?", (chat_id,), max_rows=20))
+    assert len(rows) == 20
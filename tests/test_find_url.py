@@ -0,0 +1,39 @@
+import re
+
+import pytest
+
+import bot
+
+
+class FakeHyperscanDB:
+    """Reports prefix matches at byte offsets, like the compiled hyperscan database."""
+
+    _prefix = re.compile(rb"(?i)https?://|www\.|t\.me/|telegram\.me/")
+
+    def scan(self, data, match_event_handler):
+        for m in self._prefix.finditer(data):
+            match_event_handler(0, m.start(), m.end(), 0, None)
+
+
+CASES = [
+    ("no link here", None),
+    ("cek https://example.com/a?b=1 ya", "https://example.com/a?b=1"),
+    ("WWW.Example.com", "WWW.Example.com"),
+    # multibyte text before the link: byte and str offsets differ
+    ("héhé 😀 t.me/channel", "t.me/channel"),
+    # Unicode whitespace (ideographic space, NBSP) ends the token
+    ("https://example.com/x\u3000sesudahnya", "https://example.com/x"),
+    ("lihat https://example.com/y\u00a0ok", "https://example.com/y"),
+]
+
+
+@pytest.mark.parametrize("text,expected", CASES)
+def test_find_url_regex_path(monkeypatch, text, expected):
+    monkeypatch.setattr(bot, "_URL_HS_DB", None)
+    assert bot.find_url(text) == expected
+
+
+@pytest.mark.parametrize("text,expected", CASES)
+def test_find_url_hyperscan_path_matches_regex(monkeypatch, text, expected):
+    monkeypatch.setattr(bot, "_URL_HS_DB", FakeHyperscanDB())
+    assert bot.find_url(text) == expected
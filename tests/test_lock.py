@@ -0,0 +1,46 @@
+import fcntl
+import os
+
+import pytest
+
+import bot
+
+
+@pytest.fixture
+def lock_file(tmp_path, monkeypatch):
+    path = tmp_path / "bot.lock"
+    monkeypatch.setattr(bot, "LOCK_FILE", str(path))
+    monkeypatch.setattr(bot, "_lock_fd", None)
+    return path
+
+
+def test_held_lock_with_empty_file_exits(lock_file):
+    # the holder has flocked the file but not written its PID yet
+    holder = os.open(lock_file, os.O_CREAT | os.O_RDWR)
+    fcntl.flock(holder, fcntl.LOCK_EX)
+    try:
+        with pytest.raises(SystemExit) as exc:
+            bot.acquire_lock()
+        assert exc.value.code == 0
+        assert lock_file.exists()
+        assert bot._lock_fd is None
+    finally:
+        os.close(holder)
+
+
+def test_unheld_lock_file_is_taken_over(lock_file):
+    # leftover from a crashed run: garbage content, nobody holds the flock
+    lock_file.write_text("not-a-pid")
+    bot.acquire_lock()
+    try:
+        assert lock_file.read_text() == str(os.getpid())
+        probe = os.open(lock_file, os.O_RDWR)
+        try:
+            with pytest.raises(OSError):
+                fcntl.flock(probe, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        finally:
+            os.close(probe)
+    finally:
+        bot.cleanup_lock()
+    assert bot._lock_fd is None
+    assert lock_file.exists()
@@ -0,0 +1,122 @@
+import asyncio
+import json
+
+import pytest
+from telegram import Update
+from telegram.ext import Application
+from telegram.request import BaseRequest
+
+import bot
+
+CHAT = {"id": -100123, "type": "supergroup", "title": "grup"}
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Bot", "username": "test_bot"}
+MEMBER = {"id": 555, "is_bot": False, "first_name": "Spammer"}
+# fields ChatMemberAdministrator requires besides status/user
+ADMIN_RIGHTS = (
+    "can_be_edited",
+    "is_anonymous",
+    "can_manage_chat",
+    "can_delete_messages",
+    "can_manage_video_chats",
+    "can_restrict_members",
+    "can_promote_members",
+    "can_change_info",
+    "can_invite_users",
+)
+
+
+class RecordingRequest(BaseRequest):
+    """Answers Bot API calls offline and records (method, params) for each one."""
+
+    def __init__(self, member_status="member", **_kwargs):
+        self.member_status = member_status
+        self.calls = []
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, **_kwargs):
+        api_method = url.rsplit("/", 1)[-1]
+        params = request_data.parameters if request_data else {}
+        self.calls.append((api_method, params))
+        if api_method == "getMe":
+            result = BOT_USER
+        elif api_method == "getChatMember":
+            result = {"status": self.member_status, "user": MEMBER}
+            if self.member_status == "administrator":
+                result.update(dict.fromkeys(ADMIN_RIGHTS, False))
+        elif api_method == "sendMessage":
+            result = {"message_id": 99, "date": 0, "chat": CHAT, "from": BOT_USER, "text": params.get("text", "")}
+        else:
+            result = True
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+
+@pytest.fixture
+def build_app(monkeypatch):
+    """Run bot.main() up to run_polling with offline requests; returns (app, request, run_polling kwargs)."""
+    monkeypatch.setattr(bot, "BOT_TOKEN", "123:TEST")
+    monkeypatch.setattr(bot, "MEMBER_STATUS_CACHE", {})
+    built = {}
+
+    def make(member_status):
+        request = RecordingRequest(member_status)
+        monkeypatch.setattr(bot, "HTTPXRequest", lambda **kwargs: request)
+        monkeypatch.setattr(Application, "run_polling", lambda self, **kwargs: built.update(app=self, polling=kwargs))
+        bot.main()
+        return built["app"], request, built["polling"]
+
+    return make
+
+
+def command_with_link(text="/ban https://spam.example"):
+    url = "https://spam.example"
+    return {
+        "update_id": 1,
+        "message": {
+            "message_id": 10,
+            "date": 0,
+            "chat": CHAT,
+            "from": MEMBER,
+            "text": text,
+            "entities": [
+                {"type": "bot_command", "offset": 0, "length": text.index(" ")},
+                {"type": "url", "offset": text.index(url), "length": len(url)},
+            ],
+        },
+    }
+
+
+async def dispatch(app, payload):
+    await app.initialize()
+    try:
+        await app.process_update(Update.de_json(payload, app.bot))
+    finally:
+        await app.shutdown()
+
+
+def test_non_admin_command_with_link_is_moderated(build_app):
+    app, request, _ = build_app("member")
+    asyncio.run(dispatch(app, command_with_link()))
+    methods = [m for m, _ in request.calls]
+    # group 0: /ban refuses the non-admin; group 1: anti-link still deletes and bans
+    assert "deleteMessage" in methods
+    bans = [p for m, p in request.calls if m == "banChatMember"]
+    assert bans and bans[0]["user_id"] == MEMBER["id"]
+
+
+def test_admin_command_with_link_is_not_moderated(build_app):
+    app, request, _ = build_app("administrator")
+    asyncio.run(dispatch(app, command_with_link()))
+    methods = [m for m, _ in request.calls]
+    assert "deleteMessage" not in methods
+    assert "banChatMember" not in methods
+
+
+def test_polling_asks_only_for_handled_update_types(build_app):
+    _, _, polling = build_app("member")
+    allowed = polling["allowed_updates"]
+    assert sorted(allowed) == sorted([Update.MESSAGE, Update.CALLBACK_QUERY, Update.CHAT_MEMBER])
@@ -0,0 +1,66 @@
+import pytest
+
+import bot
+
+
+@pytest.fixture(scope="module")
+def ydl_extractors():
+    bot.load_ydl_extractors()
+    yield
+    bot._YDL_EXTRACTORS.clear()
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://cdn.example.com/v/clip.mp4",
+        "https://cdn.example.com/v/CLIP.MP4?sig=abc",
+        "http://example.com/audio/song.mp3#t=10",
+        "https://stream.example.com/live/index.m3u8",
+        "example.com/a.webm",
+    ],
+)
+def test_media_ext_re_accepts_direct_media(url):
+    assert bot.MEDIA_EXT_RE.match(url)
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://example.com/video.mp4.html",
+        "https://example.com/watch?file=clip.mp4",
+        "https://example.com/#/clip.mp4",
+        "https://example.com/mp4",
+    ],
+)
+def test_media_ext_re_rejects_pages(url):
+    assert not bot.MEDIA_EXT_RE.match(url)
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+        "youtu.be/dQw4w9WgXcQ",
+        "https://vm.tiktok.com/ZM123/",
+        "https://x.com/user/status/1",
+        "https://cdn.example.com/v/clip.mp4",
+    ],
+)
+def test_common_hosts_and_media_need_no_extractor_list(monkeypatch, url):
+    monkeypatch.setattr(bot, "_YDL_EXTRACTORS", [])
+    assert bot.is_supported_video_url(url)
+
+
+def test_lookalike_host_is_not_a_common_host(monkeypatch):
+    monkeypatch.setattr(bot, "_YDL_EXTRACTORS", [])
+    assert not bot.is_supported_video_url("https://notyoutube.com/watch?v=1")
+
+
+def test_site_extractor_accepts_other_supported_sites(ydl_extractors):
+    assert bot.is_supported_video_url("https://vimeo.com/76979871")
+
+
+def test_generic_only_pages_are_rejected(ydl_extractors):
+    assert not any(ie.ie_key() == "Generic" for ie in bot._YDL_EXTRACTORS)
+    assert not bot.is_supported_video_url("https://example.com/news/some-article")